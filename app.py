@@ -8,13 +8,19 @@ Windows Subsystem for Linux (WSL2) のディストリビューションを管理
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 import subprocess
+import codecs
 import re
 import os
-import tempfile
 import threading
-import json
-import configparser
 import sys
+from fast_helpers import parse_wsl_header, parse_wsl_line, format_string
+
+_LANGUAGE_SETTING = re.compile(r'^[ \t]*language[ \t]*=[ \t]*(\S+)', re.M | re.I)
+_MIN_SIZE_SETTING = re.compile(r'^[ \t]*(min_width|min_height)[ \t]*=[ \t]*(\d+)', re.M | re.I)
+# 最も長い訳語（日本語）のボタン列が切れない最小ウィンドウサイズ
+DEFAULT_MIN_SIZE = (760, 520)
+# wsl --list --verbose が英語環境で返す状態名
+_ENGLISH_STATES = {"Running", "Stopped", "Installing", "Converting", "Uninstalling"}
 
 def resource_path(relative_path):
     """ 開発環境とEXE実行環境の両方でリソースへの絶対パスを取得する """
@@ -24,10 +30,31 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
+_json_loads = None
+
+def parse_json(data):
+    """ orjson があれば高速な orjson で、なければ標準の json でバイト列を解析する """
+    global _json_loads
+    if _json_loads is None:
+        try:
+            import orjson
+            _json_loads = orjson.loads
+        except ImportError:
+            import json
+            _json_loads = json.loads
+    if data.startswith(codecs.BOM_UTF8):
+        data = data[len(codecs.BOM_UTF8):]
+    return _json_loads(data)
+
 class WSLOrchestrator(tk.Tk):
     def __init__(self):
         super().__init__()
         self.config_file = 'config.ini'
+        self._lang_cache = {}
+        self._list_generation = 0
+        self._applied_generation = 0
+        self._distro_names = set()
+        self._string_cache = {}
         self.load_config()
         self.load_language()
         self.title(self.get_string("app_title", fallback="WSL Orchestrator"))
@@ -40,46 +67,70 @@ class WSLOrchestrator(tk.Tk):
         self.create_menus()
         self.create_widgets()
         self.populate_wsl_list()
-        self.update_idletasks()
-        min_width = self.winfo_reqwidth()
-        min_height = self.winfo_reqheight()
-        self.minsize(min_width, min_height)
+        settings = self.app_config['Settings']
+        self.minsize(int(settings.get('min_width', DEFAULT_MIN_SIZE[0])), int(settings.get('min_height', DEFAULT_MIN_SIZE[1])))
 
     def get_string(self, key, fallback=None, **kwargs):
-        if fallback is None:
-            fallback = key
-        return self.lang_data.get(key, fallback).format(**kwargs)
+        # 引数付きの文字列（ディストリビューション名など）はキャッシュしない
+        if kwargs:
+            return format_string(self.lang_data, key, fallback, kwargs)
+        cache_key = (key, fallback)
+        text = self._string_cache.get(cache_key)
+        if text is not None:
+            return text
+        text = format_string(self.lang_data, key, fallback, kwargs)
+        self._string_cache[cache_key] = text
+        return text
 
     def load_language(self):
+        self._string_cache.clear()
+        # 一度読み込んだ言語ファイルは再利用し、切り替え時のディスクI/Oを省く
+        if self.current_language in self._lang_cache:
+            self.lang_data = self._lang_cache[self.current_language]
+            return
         try:
             locale_path = resource_path(os.path.join("locale", f"{self.current_language}.json"))
-            with open(locale_path, 'r', encoding='utf-8-sig') as f:
-                self.lang_data = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
+            with open(locale_path, 'rb') as f:
+                self.lang_data = parse_json(f.read())
+            self._lang_cache[self.current_language] = self.lang_data
+        except (FileNotFoundError, ValueError) as e:
             self.current_language = 'en'
             self.lang_data = {}
             messagebox.showwarning("Language Error", f"Could not load language file '{self.current_language}'.\nError: {e}\nFalling back to English.")
             try:
                 fallback_path = resource_path(os.path.join("locale", "en.json"))
-                with open(fallback_path, 'r', encoding='utf-8-sig') as f:
-                    self.lang_data = json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError):
+                with open(fallback_path, 'rb') as f:
+                    self.lang_data = parse_json(f.read())
+                self._lang_cache['en'] = self.lang_data
+            except (FileNotFoundError, ValueError):
                  messagebox.showerror("Critical Error", "Default language file 'locale/en.json' is missing or corrupt.")
 
     def load_config(self):
-        self.app_config = configparser.ConfigParser()
+        # 設定は language と任意の最小サイズだけのため、先頭部分だけを読んで取り出す
+        self.current_language = 'ja'
+        min_sizes = {}
         if os.path.exists(self.config_file):
-            self.app_config.read(self.config_file)
-            self.current_language = self.app_config.get('Settings', 'language', fallback='ja')
-        else:
-            self.current_language = 'ja'
+            with open(self.config_file, 'r') as configfile:
+                head = configfile.read(256)
+            m = _LANGUAGE_SETTING.search(head)
+            if m:
+                self.current_language = m.group(1)
+            for m in _MIN_SIZE_SETTING.finditer(head):
+                min_sizes[m.group(1).lower()] = m.group(2)
+        self.app_config = {'Settings': {'language': self.current_language, **min_sizes}}
+        self._loaded_language = self.current_language
 
     def save_config(self):
-        if 'Settings' not in self.app_config:
-            self.app_config['Settings'] = {}
+        # 読み込み時から変更がなければ書き込まない
+        if self.current_language == self._loaded_language: return
         self.app_config['Settings']['language'] = self.current_language
-        with open(self.config_file, 'w') as configfile:
-            self.app_config.write(configfile)
+        temp_file = self.config_file + '.tmp'
+        with open(temp_file, 'w') as configfile:
+            configfile.write("[Settings]\n")
+            for key, value in self.app_config['Settings'].items():
+                configfile.write("%s = %s\n" % (key, value))
+        os.replace(temp_file, self.config_file)
+        self._loaded_language = self.current_language
 
     def on_closing(self):
         self.save_config()
@@ -105,10 +156,15 @@ class WSLOrchestrator(tk.Tk):
         self.menubar.add_cascade(label=self.get_string("menu_help"), menu=self.help_menu)
         self.help_menu.add_command(label=self.get_string("menu_about"), command=self.show_about)
 
-    def create_widgets(self):
+    def rebuild_widgets(self):
+        """全ウィジェットを破棄して作り直す（言語切り替えでは不要。update_ui_language を使う）"""
         for widget in self.winfo_children():
             if isinstance(widget, ttk.Frame):
                 widget.destroy()
+        self.create_widgets()
+        self.populate_wsl_list()
+
+    def create_widgets(self):
         main_frame = ttk.Frame(self, padding="10")
         main_frame.pack(fill="both", expand=True)
         list_frame = ttk.Frame(main_frame)
@@ -151,30 +207,43 @@ class WSLOrchestrator(tk.Tk):
         guidance_frame.pack(fill="x")
         self.usb_guide_button = ttk.Button(guidance_frame, command=self.show_usb_guide)
         self.usb_guide_button.pack(side="left", padx=5)
+        # (設定メソッド, 位置引数, オプション名, 言語キー) の表。update_ui_language で使う
+        self._label_bindings = [
+            (self.title, (), None, "app_title"),
+            (self.menubar.entryconfig, (1,), "label", "menu_file"),
+            (self.file_menu.entryconfig, (0,), "label", "menu_quit"),
+            (self.menubar.entryconfig, (2,), "label", "menu_settings"),
+            (self.settings_menu.entryconfig, (0,), "label", "menu_language"),
+            (self.menubar.entryconfig, (3,), "label", "menu_help"),
+            (self.help_menu.entryconfig, (0,), "label", "menu_about"),
+            (self.tree.heading, ("Name",), "text", "column_name"),
+            (self.tree.heading, ("State",), "text", "column_state"),
+            (self.tree.heading, ("Version",), "text", "column_version"),
+            (self.refresh_button.config, (), "text", "button_refresh"),
+            (self.terminal_button.config, (), "text", "button_terminal"),
+            (self.start_button.config, (), "text", "button_start"),
+            (self.rename_button.config, (), "text", "button_rename"),
+            (self.stop_button.config, (), "text", "button_stop"),
+            (self.shutdown_button.config, (), "text", "button_shutdown"),
+            (self.usb_guide_button.config, (), "text", "usb_guide_button"),
+            (self.shortcut_frame.config, (), "text", "shortcut_title"),
+            (self.shortcut_label1.config, (), "text", "shortcut_label"),
+            (self.shortcut_label2.config, (), "text", "shortcut_howto"),
+        ]
+        self._last_labels = {}
         self.update_ui_language()
 
     def update_ui_language(self):
-        self.title(self.get_string("app_title"))
-        self.menubar.entryconfig(1, label=self.get_string("menu_file"))
-        self.file_menu.entryconfig(0, label=self.get_string("menu_quit"))
-        self.menubar.entryconfig(2, label=self.get_string("menu_settings"))
-        self.settings_menu.entryconfig(0, label=self.get_string("menu_language"))
-        self.menubar.entryconfig(3, label=self.get_string("menu_help"))
-        self.help_menu.entryconfig(0, label=self.get_string("menu_about"))
-        self.tree.heading("Name", text=self.get_string("column_name"))
-        self.tree.heading("State", text=self.get_string("column_state"))
-        self.tree.heading("Version", text=self.get_string("column_version"))
-        self.refresh_button.config(text=self.get_string("button_refresh"))
-        self.terminal_button.config(text=self.get_string("button_terminal")) # ★★★ 追加 ★★★
-        self.start_button.config(text=self.get_string("button_start"))
-        self.rename_button.config(text=self.get_string("button_rename"))
-        self.stop_button.config(text=self.get_string("button_stop"))
-        self.shutdown_button.config(text=self.get_string("button_shutdown"))
-        self.usb_guide_button.config(text=self.get_string("usb_guide_button"))
-        self.shortcut_frame.config(text=self.get_string("shortcut_title"))
-        self.shortcut_label1.config(text=self.get_string("shortcut_label"))
-        self.shortcut_label2.config(text=self.get_string("shortcut_howto"))
-    
+        # 前回と同じ文字列の項目は設定し直さず、Tclの呼び出しを省く
+        for index, (setter, args, option, key) in enumerate(self._label_bindings):
+            text = self.get_string(key)
+            if self._last_labels.get(index) == text: continue
+            if option is None:
+                setter(*args, text)
+            else:
+                setter(*args, **{option: text})
+            self._last_labels[index] = text
+
     def change_language(self, lang_code):
         if self.current_language == lang_code: return
         self.current_language = lang_code
@@ -186,9 +255,7 @@ class WSLOrchestrator(tk.Tk):
 
     def run_command(self, command):
         try:
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            result = subprocess.run(command, capture_output=True, text=True, encoding='utf-16-le', errors='ignore', check=True, startupinfo=startupinfo)
+            result = subprocess.run(command, capture_output=True, text=True, encoding='utf-16-le', errors='ignore', check=True, stdin=subprocess.DEVNULL, creationflags=subprocess.CREATE_NO_WINDOW)
             return result.stdout
         except FileNotFoundError:
             return f"Error: {self.get_string('error_wsl_not_found')}"
@@ -196,26 +263,55 @@ class WSLOrchestrator(tk.Tk):
             return f"Error: Command Error\n{e.stderr}"
 
     def populate_wsl_list(self):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        output = self.run_command(["wsl", "--list", "--verbose"])
-        if output is None or output.startswith("Error:"): return
-        lines = output.strip().split('\n')[1:]
-        for line in lines:
-            cleaned_line = line.strip().lstrip('\ufeff')
-            if not cleaned_line: continue
-            if cleaned_line.startswith('*'):
-                processed_line = cleaned_line[1:].lstrip()
-            else:
-                processed_line = cleaned_line
-            parts = re.split(r'\s{2,}', processed_line)
-            if len(parts) == 3:
-                name = re.sub(r'[^\w.-]', '', parts[0])
-                state = parts[1].strip().replace('\x00', '')
-                version = parts[2].strip().replace('\x00', '')
-                self.tree.insert("", "end", values=(name, state, version))
+        """wsl.exe の呼び出しはワーカースレッドで行い、UIスレッドを止めない"""
+        # 古い更新スレッドから届いた結果は世代番号で読み捨てる
+        self._list_generation += 1
+        threading.Thread(target=self._fetch_wsl, args=(self._list_generation,), daemon=True).start()
+
+    def _fetch_wsl(self, generation):
+        """wsl --list の結果を解析し、成功した場合だけ行をまとめてUIスレッドへ渡す"""
+        rows = None
+        try:
+            output = self.run_command(["wsl", "--list", "--verbose"])
+            # 失敗時の出力（ディストリビューション未登録の案内など）は行として扱わない
+            if output is not None and not output.startswith("Error:"):
+                rows = []
+                # 列の位置を崩さないよう、先頭の空白は削らずに空行だけを除く
+                lines = [line for line in output.splitlines() if line.strip()]
+                if lines:
+                    offsets = parse_wsl_header(lines[0])
+                    for line in lines[1:]:
+                        row = parse_wsl_line(line, offsets)
+                        if row is not None:
+                            rows.append(row)
+        finally:
+            # 例外で終了した場合も必ず結果を通知し、更新中の状態を解除する
+            self.after(0, self._apply_wsl_list, generation, rows)
+
+    def _apply_wsl_list(self, generation, rows):
+        if generation != self._list_generation: return
+        self._applied_generation = generation
+        # 削除と追加を1回のコールバックでまとめて行う
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self._distro_names = set()
+        if rows is None: return
+        for values in rows:
+            self.tree.insert("", "end", values=values)
+            self._distro_names.add(values[0])
         self.on_item_select(None)
 
+    def _refresh_in_flight(self):
+        """最後に開始した一覧の更新がまだ反映されていなければ True"""
+        return self._applied_generation != self._list_generation
+
+    def _can_patch_states(self):
+        """一覧を取り直さずに状態列を "Stopped" へ書き換えてよければ True"""
+        # on_item_select などは英語の "Stopped" と比較しているため、状態名が翻訳されている環境では書き換えない
+        if self._refresh_in_flight(): return False
+        return all(self.tree.set(item, "State") in _ENGLISH_STATES for item in self.tree.get_children())
+
     def on_item_select(self, event):
         selected_items = self.tree.selection()
         if selected_items:
@@ -278,13 +374,28 @@ class WSLOrchestrator(tk.Tk):
         if not selected_items: return
         distro_name = self.tree.item(selected_items[0])['values'][0]
         if messagebox.askyesno(self.get_string("confirm_stop_title"), self.get_string("confirm_stop_message", distro_name=distro_name)):
-            self.run_command(["wsl", "--terminate", distro_name])
-            self.populate_wsl_list()
+            result = self.run_command(["wsl", "--terminate", distro_name])
+            # 失敗時、一覧の更新中、状態名が英語でない場合は、手元の行を書き換えずに一覧を取り直す
+            if (result and result.startswith("Error:")) or not self._can_patch_states():
+                self.populate_wsl_list()
+                return
+            # 成功時は wsl --list を再実行せず、該当行の状態だけを書き換える。
+            # 確認ダイアログ中に一覧が入れ替わっている場合があるため、行は名前で探し直す
+            for item in self.tree.get_children():
+                if self.tree.set(item, "Name") == str(distro_name):
+                    self.tree.set(item, "State", "Stopped")
+                    break
+            self.on_item_select(None)
 
     def shutdown_all(self):
         if messagebox.askyesno(self.get_string("confirm_shutdown_title"), self.get_string("confirm_shutdown_message")):
-            self.run_command(["wsl", "--shutdown"])
-            self.populate_wsl_list()
+            result = self.run_command(["wsl", "--shutdown"])
+            if (result and result.startswith("Error:")) or not self._can_patch_states():
+                self.populate_wsl_list()
+                return
+            for item in self.tree.get_children():
+                self.tree.set(item, "State", "Stopped")
+            self.on_item_select(None)
     
     def rename_distro(self):
         selected_items = self.tree.selection()
@@ -298,38 +409,98 @@ class WSLOrchestrator(tk.Tk):
         if ' ' in new_name:
             messagebox.showerror(self.get_string("error_title"), self.get_string("error_rename_no_space"))
             return
-        current_names = [self.tree.item(i)['values'][0] for i in self.tree.get_children()]
-        if new_name in current_names:
+        if new_name in self._distro_names:
             messagebox.showerror(self.get_string("error_title"), self.get_string("error_rename_duplicate", new_name=new_name))
             return
         if not messagebox.askyesno(self.get_string("rename_confirm_title"), self.get_string("rename_confirm_message", old_name=old_name, new_name=new_name)): return
         self.show_progress_window()
+        # 前回の結果が残らないよう、開始時に毎回リセットする
+        self.rename_result = None
         self.rename_thread = threading.Thread(target=self._rename_worker, args=(old_name, new_name))
         self.rename_thread.start()
-        self.check_rename_status()
 
     def _rename_worker(self, old_name, new_name):
-        temp_dir = tempfile.gettempdir()
-        export_file = os.path.join(temp_dir, f"{old_name}_export.tar")
-        result = self.run_command(["wsl", "--export", old_name, export_file])
-        if result and result.startswith("Error:"):
-            self.rename_result = f"Export failed:\n{result}"
-            return
-        result = self.run_command(["wsl", "--unregister", old_name])
-        if result and result.startswith("Error:"):
-            self.rename_result = f"Unregister failed:\n{result}"
-            os.remove(export_file)
-            return
-        docs_path = os.path.join(os.path.expanduser('~'), 'Documents')
-        import_dir = os.path.join(docs_path, 'WSL_Distros', new_name)
-        os.makedirs(import_dir, exist_ok=True)
-        result = self.run_command(["wsl", "--import", new_name, import_dir, export_file])
-        if result and result.startswith("Error:"):
-            self.rename_result = f"Import failed:\n{result}"
+        try:
+            docs_path = os.path.join(os.path.expanduser('~'), 'Documents')
+            import_dir = os.path.join(docs_path, 'WSL_Distros', new_name)
+            os.makedirs(import_dir, exist_ok=True)
+            # まず一時tarファイルを介さないストリーム転送を試し、使えない場合のみ従来の方法に戻る
+            streamed, detail = self._stream_export_import(old_name, new_name, import_dir)
+            if streamed is False:
+                # 転送中の失敗では元のディストリビューションを登録したまま中止する
+                self.rename_result = f"Import failed:\n{detail}\n'{old_name}' is still registered."
+                return
+            if streamed:
+                result = self.run_command(["wsl", "--unregister", old_name])
+                if result and result.startswith("Error:"):
+                    self.rename_result = f"Unregister failed:\n{result}"
+                    return
+                self.rename_result = self.get_string("rename_success_message", new_name=new_name)
+                return
+            import tempfile
+            temp_dir = tempfile.gettempdir()
+            export_file = os.path.join(temp_dir, f"{old_name}_export.tar")
+            result = self.run_command(["wsl", "--export", old_name, export_file])
+            if result and result.startswith("Error:"):
+                self.rename_result = f"Export failed:\n{result}"
+                return
+            result = self.run_command(["wsl", "--unregister", old_name])
+            if result and result.startswith("Error:"):
+                self.rename_result = f"Unregister failed:\n{result}"
+                os.remove(export_file)
+                return
+            result = self.run_command(["wsl", "--import", new_name, import_dir, export_file])
+            if result and result.startswith("Error:"):
+                self.rename_result = f"Import failed:\n{result}"
+                os.remove(export_file)
+                return
             os.remove(export_file)
-            return
-        os.remove(export_file)
-        self.rename_result = self.get_string("rename_success_message", new_name=new_name)
+            self.rename_result = self.get_string("rename_success_message", new_name=new_name)
+        except Exception as e:
+            self.rename_result = f"Rename failed:\n{e}"
+        finally:
+            # 完了をポーリングせず、ワーカーからUIスレッドへ通知する
+            self.after(0, self._on_rename_done)
+
+    def _stream_export_import(self, old_name, new_name, import_dir):
+        """wsl --export の出力を wsl --import へ直接流し込む。
+        (結果, エラー詳細) を返す。結果は成功なら True、転送中の失敗なら False、ストリーム転送が使えない場合は None"""
+        import shutil
+        try:
+            export_proc = subprocess.Popen(["wsl", "--export", old_name, "-"], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, creationflags=subprocess.CREATE_NO_WINDOW)
+        except OSError:
+            return None, ""
+        with export_proc:
+            # データを1バイトも出さずに終了した場合は「-」指定に未対応とみなす（import はまだ起動していない）
+            first_chunk = export_proc.stdout.read(1 << 16)
+            if not first_chunk:
+                return None, ""
+            try:
+                # エラーメッセージは短いため、stderr は転送後にまとめて読む
+                import_proc = subprocess.Popen(["wsl", "--import", new_name, import_dir, "-"], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, bufsize=0, creationflags=subprocess.CREATE_NO_WINDOW)
+            except OSError as e:
+                export_proc.kill()
+                return False, str(e)
+            with import_proc:
+                try:
+                    import_proc.stdin.write(first_chunk)
+                    shutil.copyfileobj(export_proc.stdout, import_proc.stdin, 1 << 20)
+                except OSError:
+                    # import 側が途中で終了した
+                    export_proc.kill()
+                _, import_stderr = import_proc.communicate()
+        if export_proc.returncode == 0 and import_proc.returncode == 0:
+            return True, ""
+        if import_proc.returncode != 0:
+            detail = import_stderr.decode('utf-16-le', errors='ignore').replace('\x00', '').strip()
+            detail = detail or f"wsl --import exited with code {import_proc.returncode}."
+        else:
+            detail = f"wsl --export exited with code {export_proc.returncode}."
+            # 途中で途切れたデータが取り込まれた可能性があるため、新しい登録を取り消す
+            result = self.run_command(["wsl", "--unregister", new_name])
+            if result and result.startswith("Error:"):
+                detail += f"\n'{new_name}' may contain incomplete data and could not be unregistered:\n{result}"
+        return False, detail
 
     def show_progress_window(self):
         self.progress_win = tk.Toplevel(self)
@@ -344,17 +515,14 @@ class WSLOrchestrator(tk.Tk):
         prog_bar.pack(fill='x', padx=20, pady=5)
         prog_bar.start(10)
 
-    def check_rename_status(self):
-        if self.rename_thread.is_alive():
-            self.after(100, self.check_rename_status)
-        else:
-            self.progress_win.destroy()
-            if hasattr(self, 'rename_result'):
-                if "failed" in self.rename_result.lower():
-                     messagebox.showerror(self.get_string("error_title"), self.rename_result)
-                else:
-                     messagebox.showinfo("Success", self.rename_result)
-            self.populate_wsl_list()
+    def _on_rename_done(self):
+        self.progress_win.destroy()
+        if self.rename_result:
+            if "failed" in self.rename_result.lower():
+                 messagebox.showerror(self.get_string("error_title"), self.rename_result)
+            else:
+                 messagebox.showinfo("Success", self.rename_result)
+        self.populate_wsl_list()
 
     def show_usb_guide(self):
         title = self.get_string("usb_guide_title")
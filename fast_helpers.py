@@ -0,0 +1,61 @@
+# coding: utf-8
+"""
+WSL Orchestrator の頻繁に呼ばれる処理をまとめたモジュールです。
+
+配布用ビルドでは setup.py で mypyc によりコンパイルできます。コンパイル済みの
+拡張モジュールは同名の .py より優先して読み込まれるため、app.py 側の変更は不要です。
+"""
+import re
+from typing import Dict, Optional, Tuple
+
+_COLUMN_SPLIT = re.compile(r'\s{2,}')
+_COLUMN_TITLE = re.compile(r'\S+(?: \S+)*')
+_NAME_CLEAN = re.compile(r'[^\w.-]')
+
+def parse_wsl_header(header: str) -> Optional[Tuple[int, int]]:
+    """ ヘッダー行から STATE 列と VERSION 列の開始位置を求める。3列でなければ None """
+    # 見出しは翻訳される場合があるため、文字列ではなく2つ以上の空白で区切られた位置で判定する
+    starts = [m.start() for m in _COLUMN_TITLE.finditer(header.lstrip('\ufeff').replace('\x00', ''))]
+    if len(starts) != 3:
+        return None
+    return starts[1], starts[2]
+
+def parse_wsl_line(line: str, offsets: Optional[Tuple[int, int]] = None) -> Optional[Tuple[str, str, str]]:
+    """ `wsl --list --verbose` の1行を (名前, 状態, バージョン) に分解する。解析できなければ None
+
+    offsets には parse_wsl_header の結果を渡す。列の位置で切り出せない行は、
+    2つ以上の空白による分割で解析する。
+    """
+    line = line.rstrip('\r\n').replace('\x00', '')
+    if offsets is not None:
+        state_start, version_start = offsets
+        # 列の境界が空白に当たる行だけを位置で切り出す（状態名に含まれる単一の空白も保持される）
+        if len(line) > version_start and line[state_start - 1].isspace() and line[version_start - 1].isspace():
+            name_part = line[:state_start].strip().lstrip('\ufeff')
+            if name_part.startswith('*'):
+                name_part = name_part[1:].lstrip()
+            state = line[state_start:version_start].strip()
+            version = line[version_start:].strip()
+            if name_part and state and version:
+                return _NAME_CLEAN.sub('', name_part), state, version
+    cleaned_line = line.strip().lstrip('\ufeff')
+    if not cleaned_line:
+        return None
+    if cleaned_line.startswith('*'):
+        processed_line = cleaned_line[1:].lstrip()
+    else:
+        processed_line = cleaned_line
+    # 列は2つ以上の空白で区切られる。列内の単一の空白（翻訳された状態名など）は保持する
+    parts = _COLUMN_SPLIT.split(processed_line)
+    if len(parts) != 3:
+        return None
+    name = _NAME_CLEAN.sub('', parts[0])
+    state = parts[1].strip()
+    version = parts[2].strip()
+    return name, state, version
+
+def format_string(lang_data: Dict[str, str], key: str, fallback: Optional[str], kwargs: Dict[str, object]) -> str:
+    """ 言語データから key の文字列を取り出し、kwargs で書式化する """
+    if fallback is None:
+        fallback = key
+    return lang_data.get(key, fallback).format(**kwargs)
@@ -0,0 +1,17 @@
+# coding: utf-8
+"""
+fast_helpers.py を mypyc でコンパイルするためのビルドスクリプトです（任意）。
+
+    pip install mypy
+    python setup.py build_ext --inplace
+
+生成された拡張モジュールは app.py と同じフォルダに置かれ、PyInstaller での
+EXE ビルド時にもそのまま取り込まれます。
+"""
+from setuptools import setup
+from mypyc.build import mypycify
+
+setup(
+    name="wsl-orchestrator-helpers",
+    ext_modules=mypycify(["fast_helpers.py"]),
+)